@@ -7,7 +7,9 @@ Compares the decay of encoded logical states from continuous decoherence noise.
 
 # %%
 import numpy as np
-from simulator_program.data_analysis_tools import fidelity_from_scratch
+from simulator_program.data_analysis_tools import (fidelity_from_scratch,
+                                                   pure_state_fidelity,
+                                                   pure_state_fidelities)
 from matplotlib import pyplot as plt
 from qiskit.providers.aer.noise.errors.standard_errors import thermal_relaxation_error
 from qiskit.quantum_info.operators.symplectic.pauli import Pauli
@@ -16,95 +18,125 @@ from qiskit.circuit.quantumcircuit import QuantumCircuit
 from qiskit.execute_function import execute
 from qiskit import Aer
 from simulator_program.stabilizers import add_snapshot_to_circuit, logical_states
+from simulator_program.custom_noise_models import thermal_relaxation_instruction
 from qiskit.quantum_info.states.measures import state_fidelity
 import scipy
-from qiskit.quantum_info import Statevector
+from qiskit.quantum_info import Statevector, DensityMatrix
 from qiskit.quantum_info.operators import Operator
 from qiskit.providers.aer.noise import kraus_error
+try:
+    from numba import njit
+except ImportError:
+    # Numba is optional, without it the functions run as plain NumPy
+    def njit(*args, **kwargs):
+        return lambda func: func
 # Settings to used across most configurations
 n_cycles = 5
 n_shots = 1
 
+# Logical states and (projected) logical Paulis, computed once for the
+# projection functions below
+_LOGICAL = logical_states(include_ancillas=None)
+_L0, _L1 = np.ascontiguousarray(_LOGICAL[0]), np.ascontiguousarray(_LOGICAL[1])
+_LPLUS = (_L0 + _L1)/np.sqrt(2)
+# Projector to the code space
+_I_L = np.outer(_L0, _L0) + np.outer(_L1, _L1)
+# Note here how the projector has to be included for this to work as expected
+_PAULI_X = Pauli('XXXXX').to_matrix() @ _I_L
+_PAULI_Y = Pauli('YYYYY').to_matrix() @ _I_L
+_PAULI_Z = Pauli('ZZZZZ').to_matrix() @ _I_L
+# Fidelities are only needed to a few decimals, so single precision is used
+# for the projections to halve the memory traffic
+_LOGICAL_PAULIS = np.stack([_I_L, _PAULI_X, _PAULI_Y, _PAULI_Z]).astype(np.complex64)
+# Logical states as the columns of a 32x2 matrix
+_L_COLS = np.column_stack([_L0, _L1]).astype(np.complex64)
+
+# Initial encoded density matrices, keyed by (theta, phi)
+_DM_CACHE = {}
+
 # Statevector(logical_0)
 def get_idle_single_qubit(snapshot_times, snapshot_type='dm', T1=40e3, T2=60e3,
                           theta=0, phi=0, pauliop='Z'):
-    """Generates a single qubit-circuit initialized in the |1> state with
-    snapshots at given times
+    """Runs a single qubit initialized in the given state and lets it decay
+    under thermal relaxation, with snapshots at given times.
+
+    Every snapshot time is simulated as its own circuit (relaxation from t=0
+    up to that time), and all circuits are run in a single job so that Aer
+    can parallelize over them.
 
     Args:
-        snapshot_times (dict): The times in the circuit to add snapshots.
+        snapshot_times (list): The times in the circuit to add snapshots.
         T1 (float): T1 thermal relaxation, given in ns.
         T2 (float): T2 relaxation, given in ns.
 
     Returns:
-        circ: Qiskit circuit object of a single qubit, with snapshots at given
-              times and thermal relaxation in between.
+        results: Qiskit results object. The snapshot at snapshot_times[i] is
+                 found in results.data(i).
     """
-    qb = QuantumRegister(1, 'qubit')
-    circ = QuantumCircuit(qb)
     initial_state = np.cos(theta/2)*np.array((1,0)) + \
         np.exp(1j*phi)*np.sin(theta/2)*np.array((0,1))
-    circ.set_density_matrix(initial_state)
-    time_passed = 0
+    circ_list = []
     for i, time in enumerate(snapshot_times):
-        time_diff = time-time_passed
-        if time_diff > 0:
-            thrm_relax = thermal_relaxation_error(
-                T1, T2, time_diff).to_instruction()
-
+        qb = QuantumRegister(1, 'qubit')
+        circ = QuantumCircuit(qb)
+        circ.set_density_matrix(initial_state)
+        if time > 0:
+            thrm_relax = thermal_relaxation_instruction(T1, T2, time)
             circ.append(thrm_relax, [qb[0]])
         add_snapshot_to_circuit(circ, snapshot_type, i, [
                                 qb[0]], conditional=False, pauliop=pauliop)
-        time_passed = time
+        circ_list.append(circ)
 
     simulator = Aer.get_backend('aer_simulator')
     simulator.set_option('method', 'density_matrix')
-    results = execute(circ, simulator,
+    results = execute(circ_list, simulator,
                       noise_model=None, shots=n_shots).result()
     return results
 
 
 def get_idle_encoded_513(snapshot_times, snapshot_type='dm', T1=40e3, T2=60e3,
                          theta=0, phi=0, pauliop='ZZZZZ'):
-    logical_0, logical_1 = logical_states(include_ancillas=None)
-    circ = QuantumCircuit(5)
-    initial_state = np.cos(theta/2)*logical_0 + \
-        np.exp(1j*phi)*np.sin(theta/2)*logical_1
-    circ.set_density_matrix(initial_state)
-    time_passed = 0
+    """Encoded version of get_idle_single_qubit. The snapshot at
+    snapshot_times[i] is found in results.data(i)."""
+    key = (theta, phi)
+    if key in _DM_CACHE:
+        rho0 = _DM_CACHE[key]
+    else:
+        psi = np.cos(theta/2)*_L0 + np.exp(1j*phi)*np.sin(theta/2)*_L1
+        rho0 = DensityMatrix(np.outer(psi, psi.conj()))
+        _DM_CACHE[key] = rho0
+    circ_list = []
     for i, time in enumerate(snapshot_times):
-        time_diff = time-time_passed
-        if time_diff > 0:
-            thrm_relax = thermal_relaxation_error(
-                T1, T2, time_diff).to_instruction()
+        circ = QuantumCircuit(5)
+        circ.set_density_matrix(rho0)
+        if time > 0:
+            thrm_relax = thermal_relaxation_instruction(T1, T2, time)
             for qubit in circ.qubits:
                 circ.append(thrm_relax, [qubit])
 
         add_snapshot_to_circuit(circ, snapshot_type, i,
                                 circ.qubits, conditional=False, pauliop=pauliop)
-        time_passed = time
+        circ_list.append(circ)
 
     simulator = Aer.get_backend('aer_simulator')
     simulator.set_option('method', 'density_matrix')
-    results = execute(circ, simulator,
+    results = execute(circ_list, simulator,
                       noise_model=None, shots=n_shots).result()
     return results
 
 def get_idle_projected_encoded_513(snapshot_times, snapshot_type='dm', T1=40e3, T2=60e3,
                          theta=0, phi=0, pauliop='ZZZZZ'):
-    logical_0, logical_1 = logical_states(include_ancillas=None)
     circ = QuantumCircuit(5)
-    initial_state = np.cos(theta/2)*logical_0 + \
-        np.exp(1j*phi)*np.sin(theta/2)*logical_1
+    initial_state = np.cos(theta/2)*_L0 + \
+        np.exp(1j*phi)*np.sin(theta/2)*_L1
     # Projection operator
-    P_L = Statevector(logical_0).to_operator()+Statevector(logical_1).to_operator()
+    P_L = Statevector(_L0).to_operator()+Statevector(_L1).to_operator()
     circ.set_density_matrix(initial_state)
     time_passed = 0
     for i, time in enumerate(snapshot_times):
         time_diff = time-time_passed
         if time_diff > 0:
-            thrm_relax = thermal_relaxation_error(
-                T1, T2, time_diff).to_instruction()
+            thrm_relax = thermal_relaxation_instruction(T1, T2, time_diff)
             for qubit in circ.qubits:
                 circ.append(thrm_relax, [qubit])
         circ.append(P_L)
@@ -119,37 +151,27 @@ def get_idle_projected_encoded_513(snapshot_times, snapshot_type='dm', T1=40e3,
     return results
 
 
+@njit(cache=True, fastmath=True)
+def _project_v1(rho, L):
+    M = L.conj().T @ rho @ L  # 2x2
+    return M / (M[0, 0] + M[1, 1])
+
+
 def project_dm_to_logical_subspace_V1(rho):
-    P_L = 0
-    logical = logical_states(include_ancillas=None)
-    for i in range(2):
-        P_L += logical[i] @ rho @ logical[i]
-    rho_L = np.zeros((2, 2), dtype=complex)
-    for i in range(2):
-        for j in range(2):
-            rho_L[i, j] = (logical[i] @ rho @ logical[j])/P_L
-    return rho_L
+    return _project_v1(np.ascontiguousarray(rho, dtype=np.complex64), _L_COLS)
 
 
-def project_dm_to_logical_subspace_V2(rho):
-    logical = logical_states(include_ancillas=None)
-    # Projector to the code space
-    I_L = np.outer(logical[0], logical[0])+np.outer(logical[1], logical[1])
-    # Note here how the projector has to be included for this to work as expected
-    logical_pauli_matrices = np.array((
-        I_L,
-        Pauli('XXXXX').to_matrix()@I_L,
-        Pauli('YYYYY').to_matrix()@I_L,
-        Pauli('ZZZZZ').to_matrix()@I_L
-    ))
+def project_dms_to_logical_subspace_V1(rhos):
+    """Same as project_dm_to_logical_subspace_V1, for a stack of density
+    matrices of shape (n, 32, 32). Returns the (n, 2, 2) projected states."""
+    Ms = np.einsum('ai,nij,jb->nab', _L_COLS.conj().T, rhos, _L_COLS)
+    return Ms / (Ms[:, 0, 0] + Ms[:, 1, 1])[:, None, None]
 
-    P_L = np.trace(rho@logical_pauli_matrices[0])
 
-    rho_L = np.zeros((2**5, 2**5), dtype=complex)
-    for i in range(4):
-        rho_L += logical_pauli_matrices[i] * \
-            np.trace(rho@logical_pauli_matrices[i])/(2*P_L)
-    return rho_L
+def project_dm_to_logical_subspace_V2(rho):
+    # Tr(rho P_i) for all four logical Paulis, where the first is P_L
+    traces = np.einsum('ij,kji->k', rho, _LOGICAL_PAULIS)
+    return np.tensordot(traces, _LOGICAL_PAULIS, axes=1) / (2*traces[0])
 
 
 def project_dm_to_logical_subspace_V3(rho):
@@ -159,32 +181,25 @@ def project_dm_to_logical_subspace_V3(rho):
         ((0, -1j), (1j, 0)),
         ((1, 0), (0, -1))
     ))
-    logical = logical_states(include_ancillas=None)
-
-    # Projector to the code space
-    I_L = np.outer(logical[0], logical[0])+np.outer(logical[1], logical[1])
-    # Note here how the projector has to be included for this to work as expected
-    logical_pauli_matrices = np.array((
-        I_L,
-        Pauli('XXXXX').to_matrix()@I_L,
-        Pauli('YYYYY').to_matrix()@I_L,
-        Pauli('ZZZZZ').to_matrix()@I_L
-    ))
 
-    P_L = np.trace(rho@logical_pauli_matrices[0])
+    # Tr(rho P_i) for all four logical Paulis, where the first is P_L
+    traces = np.einsum('ij,kji->k', rho, _LOGICAL_PAULIS)
+    return np.tensordot(traces, pauli_matrices, axes=1) / (2*traces[0])
 
-    rho_L = np.zeros((2, 2), dtype=complex)
-    for i in range(4):
-        rho_L += pauli_matrices[i] * \
-            np.trace(rho@logical_pauli_matrices[i])/(2*P_L)
-    return rho_L
+def get_snapshot_data(results):
+    """Collects the snapshots of every experiment in results into one dict,
+    so that the results data only has to be traversed once."""
+    data = {}
+    for index in range(len(results.results)):
+        data.update(results.data(index))
+    return data
 
 def monoExp(t, T, c):
     return (1-c) * np.exp(-t/T) + c
 
 def exp_projected(rho, pauliop = 'Z'):
     rho_L = project_dm_to_logical_subspace_V1(rho)
-    return np.trace(Pauli(pauliop).to_matrix() @ rho_L)
+    return np.einsum('ij,ji->', Pauli(pauliop).to_matrix(), rho_L)
 
 # %% Expectation values and fid single qubit
 T1 = 40e3
@@ -193,19 +208,25 @@ n_datapoints = 100
 times = np.linspace(0, 100e3, n_datapoints)
 #%% Run single qubit
 res_0 = get_idle_single_qubit(times, snapshot_type=['exp', 'dm'], T1=T1, T2=T2)
-exp_0 = [res_0.data()['exp_'+str(index)]for index in range(n_datapoints)]
-fid_0 = [state_fidelity([1, 0], res_0.data()['dm_'+str(index)])
-         for index in range(n_datapoints)]
+d_0 = get_snapshot_data(res_0)
+rhos_0 = np.stack([d_0['dm_'+str(index)] for index in range(n_datapoints)]).astype(np.complex64)
+exp_0 = np.fromiter((d_0['exp_'+str(index)] for index in range(n_datapoints)),
+                    float, n_datapoints)
+fid_0 = pure_state_fidelities(rhos_0, np.array([1, 0], dtype=complex))
 res_1 = get_idle_single_qubit(
     times, snapshot_type=['exp', 'dm'], theta=np.pi, T1=T1, T2=T2)
-exp_1 = [res_1.data()['exp_'+str(index)]for index in range(n_datapoints)]
-fid_1 = [state_fidelity([0, 1], res_1.data()['dm_'+str(index)])
-         for index in range(n_datapoints)]
+d_1 = get_snapshot_data(res_1)
+rhos_1 = np.stack([d_1['dm_'+str(index)] for index in range(n_datapoints)]).astype(np.complex64)
+exp_1 = np.fromiter((d_1['exp_'+str(index)] for index in range(n_datapoints)),
+                    float, n_datapoints)
+fid_1 = pure_state_fidelities(rhos_1, np.array([0, 1], dtype=complex))
 res_plus = get_idle_single_qubit(times, snapshot_type=[
                                  'exp', 'dm'], pauliop='X', theta=np.pi/2, T1=T1, T2=T2)
-exp_plus = [res_plus.data()['exp_'+str(index)]for index in range(n_datapoints)]
-fid_plus = [state_fidelity([1/np.sqrt(2), 1/np.sqrt(2)], res_plus.data()
-                           ['dm_'+str(index)]) for index in range(n_datapoints)]
+d_plus = get_snapshot_data(res_plus)
+rhos_plus = np.stack([d_plus['dm_'+str(index)] for index in range(n_datapoints)]).astype(np.complex64)
+exp_plus = np.fromiter((d_plus['exp_'+str(index)] for index in range(n_datapoints)),
+                       float, n_datapoints)
+fid_plus = pure_state_fidelities(rhos_plus, np.array([1, 1], dtype=complex)/np.sqrt(2))
 # %% plot exp values
 fig, ax = plt.subplots(1, 1, figsize=(8, 6))
 ax.plot(times, exp_0, label='<0|Z|0>')
@@ -227,31 +248,36 @@ ax.set_ylabel('Probability of initial value')
 plt.show()
 # %% Expectation values and fid encoded qubit
 res_0 = get_idle_encoded_513(times, snapshot_type=['exp', 'dm'], T1=T1, T2=T2)
-exp_0 = [res_0.data()['exp_'+str(index)]for index in range(n_datapoints)]
-fid_0 = [state_fidelity(logical_states(include_ancillas=None)[0], res_0.data()['dm_'+str(index)])
-         for index in range(n_datapoints)]
-fid_0_L = [state_fidelity([1, 0], project_dm_to_logical_subspace_V1(res_0.data()['dm_'+str(index)]))
-           for index in range(n_datapoints)]
-exp_0_L = [exp_projected(res_0.data()['dm_'+str(index)]) for index in range(n_datapoints)]
+d_0 = get_snapshot_data(res_0)
+rhos_0 = np.stack([d_0['dm_'+str(index)] for index in range(n_datapoints)]).astype(np.complex64)
+exp_0 = np.fromiter((d_0['exp_'+str(index)] for index in range(n_datapoints)),
+                    float, n_datapoints)
+fid_0 = pure_state_fidelities(rhos_0, _L0)
+fid_0_L = pure_state_fidelities(project_dms_to_logical_subspace_V1(rhos_0),
+                                np.array([1, 0], dtype=complex))
+exp_0_L = [exp_projected(rho) for rho in rhos_0]
 # res_0_P = get_idle_projected_encoded_513(times, snapshot_type=['exp'], T1=T1, T2=T2)
 # exp_0_P = [res_0_P.data()['exp_'+str(index)]for index in range(n_datapoints)]
 
 res_1 = get_idle_encoded_513(times, snapshot_type=['exp', 'dm'], T1=T1, T2=T2,theta=np.pi)
-exp_1 = [res_1.data()['exp_'+str(index)]for index in range(n_datapoints)]
-fid_1 = [state_fidelity(logical_states(include_ancillas=None)[1], res_1.data()['dm_'+str(index)])
-         for index in range(n_datapoints)]
-fid_1_L = [state_fidelity([0, 1], project_dm_to_logical_subspace_V1(res_1.data()['dm_'+str(index)]))
-           for index in range(n_datapoints)]
-exp_1_L = [exp_projected(res_1.data()['dm_'+str(index)]) for index in range(n_datapoints)]
+d_1 = get_snapshot_data(res_1)
+rhos_1 = np.stack([d_1['dm_'+str(index)] for index in range(n_datapoints)]).astype(np.complex64)
+exp_1 = np.fromiter((d_1['exp_'+str(index)] for index in range(n_datapoints)),
+                    float, n_datapoints)
+fid_1 = pure_state_fidelities(rhos_1, _L1)
+fid_1_L = pure_state_fidelities(project_dms_to_logical_subspace_V1(rhos_1),
+                                np.array([0, 1], dtype=complex))
+exp_1_L = [exp_projected(rho) for rho in rhos_1]
 
 res_plus = get_idle_encoded_513(times, snapshot_type=['exp', 'dm'], T1=T1, T2=T2, theta=np.pi/2)
-exp_plus = [res_plus.data()['exp_'+str(index)]for index in range(n_datapoints)]
-plus_L = (logical_states(include_ancillas=None)[0]+logical_states(include_ancillas=None)[1])/np.sqrt(2)
-fid_plus = [state_fidelity(plus_L, res_plus.data()['dm_'+str(index)])
-         for index in range(n_datapoints)]
-fid_plus_L = [state_fidelity([1/np.sqrt(2), 1/np.sqrt(2)], project_dm_to_logical_subspace_V1(res_plus.data()['dm_'+str(index)]))
-           for index in range(n_datapoints)]
-exp_plus_L = [exp_projected(res_plus.data()['dm_'+str(index)]) for index in range(n_datapoints)]
+d_plus = get_snapshot_data(res_plus)
+rhos_plus = np.stack([d_plus['dm_'+str(index)] for index in range(n_datapoints)]).astype(np.complex64)
+exp_plus = np.fromiter((d_plus['exp_'+str(index)] for index in range(n_datapoints)),
+                       float, n_datapoints)
+fid_plus = pure_state_fidelities(rhos_plus, _LPLUS)
+fid_plus_L = pure_state_fidelities(project_dms_to_logical_subspace_V1(rhos_plus),
+                                   np.array([1, 1], dtype=complex)/np.sqrt(2))
+exp_plus_L = [exp_projected(rho) for rho in rhos_plus]
 
 p0 = (T1, 0) # start with values near those we expect
 pars, cov = scipy.optimize.curve_fit(monoExp, times[:20], exp_0[:20], p0)
@@ -276,16 +302,25 @@ ax[1].legend()
 plt.show()
 # %% plot <X>
 res_0 = get_idle_encoded_513(times, snapshot_type=['exp', 'dm'],pauliop='XXXXX', T1=T1, T2=T2)
-exp_0 = [res_0.data()['exp_'+str(index)]for index in range(n_datapoints)]
-exp_0_L = [exp_projected(res_0.data()['dm_'+str(index)],pauliop='X') for index in range(n_datapoints)]
+d_0 = get_snapshot_data(res_0)
+rhos_0 = np.stack([d_0['dm_'+str(index)] for index in range(n_datapoints)]).astype(np.complex64)
+exp_0 = np.fromiter((d_0['exp_'+str(index)] for index in range(n_datapoints)),
+                    float, n_datapoints)
+exp_0_L = [exp_projected(rho, pauliop='X') for rho in rhos_0]
 
 res_1 = get_idle_encoded_513(times, snapshot_type=['exp', 'dm'],pauliop='XXXXX', T1=T1, T2=T2,theta=np.pi)
-exp_1 = [res_1.data()['exp_'+str(index)]for index in range(n_datapoints)]
-exp_1_L = [exp_projected(res_1.data()['dm_'+str(index)],pauliop='X') for index in range(n_datapoints)]
+d_1 = get_snapshot_data(res_1)
+rhos_1 = np.stack([d_1['dm_'+str(index)] for index in range(n_datapoints)]).astype(np.complex64)
+exp_1 = np.fromiter((d_1['exp_'+str(index)] for index in range(n_datapoints)),
+                    float, n_datapoints)
+exp_1_L = [exp_projected(rho, pauliop='X') for rho in rhos_1]
 
 res_plus = get_idle_encoded_513(times, snapshot_type=['exp', 'dm'],pauliop='XXXXX', T1=T1, T2=T2, theta=np.pi/2)
-exp_plus = [res_plus.data()['exp_'+str(index)]for index in range(n_datapoints)]
-exp_plus_L = [exp_projected(res_plus.data()['dm_'+str(index)],pauliop='X') for index in range(n_datapoints)]
+d_plus = get_snapshot_data(res_plus)
+rhos_plus = np.stack([d_plus['dm_'+str(index)] for index in range(n_datapoints)]).astype(np.complex64)
+exp_plus = np.fromiter((d_plus['exp_'+str(index)] for index in range(n_datapoints)),
+                       float, n_datapoints)
+exp_plus_L = [exp_projected(rho, pauliop='X') for rho in rhos_plus]
 
 p0 = (T1, 0) # start with values near those we expect
 pars, cov = scipy.optimize.curve_fit(monoExp, times[:60], exp_plus[:60], p0)
@@ -335,31 +370,24 @@ plt.show()
 plt.savefig('decay_proj.pdf')
 # %% Test hypothesis of P_L * F_L = F_phys
 res_0 = get_idle_encoded_513(times, snapshot_type=['dm'], T1=T1, T2=T2)
-rho = res_0.data()['dm_'+str(20)]
-logical = logical_states(include_ancillas=None)
-I_L = np.outer(logical[0], logical[0])+np.outer(logical[1], logical[1])
-logical_pauli_matrices = np.array((
-    I_L,
-    Pauli('XXXXX').to_matrix()@I_L,
-    Pauli('YYYYY').to_matrix()@I_L,
-    Pauli('ZZZZZ').to_matrix()@I_L
-))
-F_phys = state_fidelity(logical_states(include_ancillas=None)[0], rho)
-P_L = np.trace(rho@logical_pauli_matrices[0])
-F_L = state_fidelity([1, 0], project_dm_to_logical_subspace_V1(rho))
-F_L_V2 = state_fidelity(logical_states(include_ancillas=None)[0], project_dm_to_logical_subspace_V2(rho))
+d_0 = get_snapshot_data(res_0)
+rho = d_0['dm_'+str(20)]
+F_phys = state_fidelity(_L0, rho)
+P_L = np.einsum('ij,ji->', rho, _I_L)
+F_L = pure_state_fidelity(project_dm_to_logical_subspace_V1(rho), np.array([1, 0]))
+F_L_V2 = state_fidelity(_L0, project_dm_to_logical_subspace_V2(rho))
 
 print('P_L','*','F_L','=','F_phys','?')
 print(P_L,'*',F_L,'=',F_phys)
 print(np.abs(P_L*F_L-F_phys)<0.01)
 # %%
-maximally_mixed_logical_state = (np.outer(logical[0], logical[0])+np.outer(logical[1], logical[1]))/2
+maximally_mixed_logical_state = _I_L/2
 maximally_mixed_state = np.eye(2**5)/2**5
 ket0 = [0]*2**5
 ket0[0] = 1
 
-print(state_fidelity(logical_states(include_ancillas=None)[0],maximally_mixed_state))
-print(state_fidelity(logical_states(include_ancillas=None)[0],maximally_mixed_logical_state))
-print(state_fidelity(logical_states(include_ancillas=None)[0],ket0))
+print(state_fidelity(_L0,maximally_mixed_state))
+print(state_fidelity(_L0,maximally_mixed_logical_state))
+print(state_fidelity(_L0,ket0))
 
 # %%
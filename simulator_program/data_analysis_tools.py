@@ -8,11 +8,12 @@ from qiskit import Aer, execute, QuantumCircuit, QuantumRegister, AncillaRegiste
 
 # Import from Qiskit Aer noise module
 from qiskit.providers.aer.noise import thermal_relaxation_error
-from qiskit.quantum_info import state_fidelity, Pauli
+from qiskit.quantum_info import Pauli, Statevector
 
 # Our own files
 if __package__:
     from .custom_noise_models import (thermal_relaxation_model_V2,
+                                      thermal_relaxation_instruction,
                                       standard_times,
                                       extend_standard_gate_times, 
                                       GateTimes)
@@ -22,6 +23,7 @@ if __package__:
     from .idle_noise import add_idle_noise_to_circuit, get_circuit_time
 else:
     from custom_noise_models import (thermal_relaxation_model_V2,
+                                     thermal_relaxation_instruction,
                                      standard_times,
                                      extend_standard_gate_times, 
                                      GateTimes)
@@ -31,9 +33,65 @@ else:
     from idle_noise import add_idle_noise_to_circuit, get_circuit_time
 # %%
 
+# Simulator backend shared by all runs that do not go through default_execute
+_SIM = Aer.get_backend('qasm_simulator')
+
+# Ideal encoded states used as reference for fidelities, see _get_trivial_state
+_TRIVIAL_CACHE = {}
+
+
+def _get_trivial_state(theta, phi, include_ancillas=None):
+    """Returns the ideal encoded state for the given angles as a Statevector.
+    The state is only constructed once per (theta, phi, include_ancillas), as
+    sweeps typically keep the angles fixed while varying noise parameters.
+
+    It is kept as a pure state so that fidelities can use the cheaper
+    pure-state formula, see pure_state_fidelity.
+    """
+    key = (round(theta, 12), round(phi, 12), include_ancillas)
+    if key not in _TRIVIAL_CACHE:
+        _TRIVIAL_CACHE[key] = Statevector(
+            get_encoded_state(theta, phi, include_ancillas=include_ancillas))
+    return _TRIVIAL_CACHE[key]
+
+
+def pure_state_fidelities(rhos, psi):
+    """Fidelities <psi|rho|psi> of each density matrix in rhos to the pure
+    state psi, computed in a single contraction. Equivalent to calling
+    state_fidelity(rho, psi) on each of them, without its generic dispatch.
+
+    An already stacked ndarray of density matrices is used as is, and psi is
+    cast to its precision, so complex64 stacks are contracted in complex64.
+    """
+    if not isinstance(rhos, np.ndarray):
+        rhos = np.stack([np.asarray(rho) for rho in rhos])
+    psi = np.asarray(psi, dtype=np.promote_types(rhos.dtype, np.complex64))
+    return np.real(np.einsum('i,kij,j->k', psi.conj(), rhos, psi))
+
+
+def pure_state_fidelity(rho, psi):
+    """Fidelity <psi|rho|psi> of the density matrix rho to the pure state psi."""
+    return float(pure_state_fidelities([rho], psi)[0])
+
+
+def _shot_independent(circ):
+    """Whether every snapshot in circ is independent of the number of shots.
+    Noise channels act deterministically on the density matrix, but any
+    measurement before a snapshot samples an outcome per shot, which the
+    snapshot then averages over."""
+    measured = False
+    for dat in circ.data:
+        name = dat[0].name
+        if name == 'measure':
+            measured = True
+        elif measured and name.startswith('save_'):
+            return False
+    return True
+
 
 def default_execute(circ, shots=None, noise_model=None, gate_times={}, T1=40e3, T2=60e3,
-                    simulator_name='qasm_simulator', simulator_method='density_matrix'):
+                    simulator_name='qasm_simulator', simulator_method='density_matrix',
+                    memory=False):
     """Run simulation with our standard settings.
 
     Args:
@@ -44,6 +102,8 @@ def default_execute(circ, shots=None, noise_model=None, gate_times={}, T1=40e3,
         T1 ([type], optional): Defaults to 40e3.
         T2 ([type], optional):  Defaults to 60e3.
         simulator_type (str, optional): Simulation method. Defaults to 'density_matrix'.
+        memory (bool, optional): Whether to store the measurement outcome of
+                                 every shot. Defaults to False.
 
     Returns:
         Results: Qiskit results object.
@@ -63,7 +123,7 @@ def default_execute(circ, shots=None, noise_model=None, gate_times={}, T1=40e3,
         simulator.set_option('method', 'density_matrix')
 
     # Run simulation
-    results = simulator.run(circ, shots=shots).result()
+    results = simulator.run(circ, shots=shots, memory=memory).result()
     if results.success:
         return results
     else:
@@ -72,7 +132,8 @@ def default_execute(circ, shots=None, noise_model=None, gate_times={}, T1=40e3,
               'automatically transpile iSWAP into four CX gates. For more info, see: '\
               '\nhttps://qiskit.org/documentation/tutorials/simulators/4_custom_gate_noise.html'
              )
-        results = execute(circ, simulator, noise_model=noise_model,shots=shots).result()
+        results = execute(circ, simulator, noise_model=noise_model,shots=shots,
+                          memory=memory).result()
         return results
 
 
@@ -154,7 +215,12 @@ def fidelity_from_scratch(n_cycles, n_shots, gate_times={}, T1=40e3, T2=60e3,
 
     Args:
         n_cycles (int): The number of stabilizer cycles to be performed.
-        n_shots (int): The number of runs of the stabilizer circuit.
+        n_shots (int): The number of runs of the stabilizer circuit. Density
+                       matrix snapshots that no measurement precedes are
+                       identical for every shot, so if snapshot_type is 'dm',
+                       simulator_type is 'density_matrix' and the circuit has
+                       no conditional operations or measurements before its
+                       snapshots, only a single shot is run.
         gate_times (dict): The gate times for a circuit, used for thermal relaxation
                            noise. If left empty or partially filled, remaining
                            gate times default to standard_times. Can also be given
@@ -270,25 +336,34 @@ def fidelity_from_scratch(n_cycles, n_shots, gate_times={}, T1=40e3, T2=60e3,
         time = get_circuit_time(circ=circ, gate_times=full_gate_times)
 
     # Simulate the circuit
-    trivial = get_encoded_state(theta, phi, include_ancillas=None)
-    results = default_execute(circ, n_shots)
+    trivial = _get_trivial_state(theta, phi)
+    if (snapshot_type == 'dm' or snapshot_type == 'density_matrix') and \
+            simulator_type == 'density_matrix' and not conditional and \
+            _shot_independent(circ):
+        effective_shots = 1
+    else:
+        effective_shots = n_shots
+    results = default_execute(circ, effective_shots,
+                              simulator_method=simulator_type)
+    data = results.data()
 
     if data_process_type == 'recovery' or data_process_type == 'none':
         fidelities = []  # If project = True, this contains F_L
         P_Ls = []
         if snapshot_type == 'dm' or snapshot_type == 'density_matrix':
-            for current_cycle in range(label_counter.value):
-                state = results.data()['dm_' + str(current_cycle)]
+            states = []
+            for key in [f'dm_{i}' for i in range(label_counter.value)]:
+                state = data[key]
                 if project:
                     state, P_L = project_dm_to_logical_subspace_V2(
                         state, return_P_L=True)
                     P_Ls.append(np.real(P_L))
-                fidelities.append(state_fidelity(state, trivial))
+                states.append(state)
+            fidelities = pure_state_fidelities(states, trivial).tolist()
             if project:
                 return fidelities, P_Ls, time
         elif snapshot_type == 'exp' or snapshot_type == 'expectation_value':
-            for current_cycle in range(n_cycles+1):
-                fidelities.append(results.data()['exp_' + str(current_cycle)])
+            fidelities = [data[f'exp_{i}'] for i in range(n_cycles+1)]
 
         return fidelities, time
 
@@ -302,12 +377,14 @@ def fidelity_from_scratch(n_cycles, n_shots, gate_times={}, T1=40e3, T2=60e3,
         P_Ls = []
         if snapshot_type == 'dm' or snapshot_type == 'density_matrix':
             # TODO: Make this return F_L and P_L seperately and fix the references
+            states = []
             for state in get_trivial_post_select_den_mat(results, n_cycles):
                 if project:
                     state, P_L = project_dm_to_logical_subspace_V2(
                         state, return_P_L=True)
                     P_Ls.append(np.real(P_L))
-                fidelities.append(state_fidelity(state, trivial))
+                states.append(state)
+            fidelities = pure_state_fidelities(states, trivial).tolist()
             if project:
                 return fidelities, P_Ls, select_counts, time
         elif snapshot_type == 'exp' or snapshot_type == 'expectation_value':
@@ -319,11 +396,12 @@ def fidelity_from_scratch(n_cycles, n_shots, gate_times={}, T1=40e3, T2=60e3,
 
     elif data_process_type == 'post_process':
         def get_av_fidelities(states_and_counts, correct_state, n_shots):
+            psi_ket = np.asarray(correct_state)
             av_fidelities = []
             for cycle in states_and_counts:
                 fid = 0
                 for state, counts in cycle:
-                    fid += state_fidelity(state, correct_state)*counts
+                    fid += pure_state_fidelity(state, psi_ket)*counts
                 av_fidelities.append(fid/n_shots)
             return av_fidelities
         fidelities = get_av_fidelities(get_states_and_counts(
@@ -340,7 +418,13 @@ def encoding_fidelity(n_shots, gate_times={}, T1=40e3, T2=60e3,
                       idle_noise=True, theta=0., phi=0., iswap=True,
                       snapshot_type='dm', device=None, pauliop='ZZZZZ', project=False):
     """Determines the circuit fidelity of an encoding scheme for the [[5,1,3]]
-    code."""
+    code. The encoding contains no measurements, so density matrix snapshots
+    are simulated with a single shot regardless of n_shots.
+
+    The fidelity is taken against the ideal encoded state from
+    _get_trivial_state. No noiseless reference run of the circuit is
+    simulated, as its result was never used, and the circuit is run on the
+    backend as is, without transpiling it first."""
 
     # Get gate times missing from input
     if isinstance(gate_times, dict):
@@ -362,16 +446,12 @@ def encoding_fidelity(n_shots, gate_times={}, T1=40e3, T2=60e3,
     # Circuits
     circ = get_empty_stabilizer_circuit(registers)
 
-    # Initial state
-    # TODO: Better looking solution
-    extra_qubits = np.zeros(2**6)
-    extra_qubits[0] = 1.0
-    zero_state = np.kron(extra_qubits, np.array([1, 0]))
-    one_state = np.kron(extra_qubits, np.array([0, 1]))
-    psi = np.cos(theta/2)*zero_state + np.exp(1j*phi)*np.sin(theta/2)*one_state
+    # Initial state, with qubit 0 in the input state and the others in |0>.
+    # Qubit 0 is the least significant bit, so only indices 0 and 1 are nonzero
+    psi = np.zeros(2**7, dtype=complex)
+    psi[0] = np.cos(theta/2)
+    psi[1] = np.exp(1j*phi)*np.sin(theta/2)
     circ.set_density_matrix(psi)
-    psi = np.cos(theta/2)*logical_states(include_ancillas=None)[0] + np.exp(
-        1j*phi)*np.sin(theta/2)*logical_states(include_ancillas=None)[1]
 
     # Encoding
     if device == 'WACQT':
@@ -388,12 +468,6 @@ def encoding_fidelity(n_shots, gate_times={}, T1=40e3, T2=60e3,
     add_snapshot_to_circuit(circ, snapshot_type=snapshot_type, current_cycle=0, qubits=qubits,
                             pauliop=pauliop, include_barriers=True)
 
-    # Trivial state
-    if snapshot_type == 'dm' or snapshot_type == 'density_matrix':
-        trivial_res = execute(circ, Aer.get_backend(
-            'qasm_simulator'), shots=1).result()
-        trivial = trivial_res.data()['dm_0']
-
     if idle_noise:
         circ, time = add_idle_noise_to_circuit(circ, gate_times=full_gate_times,
                                                T1=T1, T2=T2, return_time=True)
@@ -403,19 +477,24 @@ def encoding_fidelity(n_shots, gate_times={}, T1=40e3, T2=60e3,
     noise_model = thermal_relaxation_model_V2(
         T1=T1, T2=T2, gate_times=full_gate_times)
     # noise_model = None
-    results = execute(circ, Aer.get_backend('qasm_simulator'),
-                      noise_model=noise_model, shots=n_shots).result()
     if snapshot_type == 'dm' or snapshot_type == 'density_matrix':
-        state = results.data()['dm_0']
-        true_state = psi
+        effective_shots = 1
+    else:
+        effective_shots = n_shots
+    results = _SIM.run(circ, noise_model=noise_model, shots=effective_shots,
+                       memory=False).result()
+    data = results.data()
+    if snapshot_type == 'dm' or snapshot_type == 'density_matrix':
+        state = data['dm_0']
+        true_state = _get_trivial_state(theta, phi)
         if project:
             state, P_L = project_dm_to_logical_subspace_V2(
                 state, return_P_L=True)
-        fidelities = state_fidelity(state, true_state)
+        fidelities = pure_state_fidelity(state, np.asarray(true_state))
         if project:
             return fidelities, circ, time['end'], P_L
     elif snapshot_type == 'exp' or snapshot_type == 'expectation_value':
-        fidelities = results.data()['exp_0']
+        fidelities = data['exp_0']
     # logical = logical_states(include_ancillas=None)
     # I_L = np.outer(logical[0], logical[0])+np.outer(logical[1], logical[1])
     # P_L = np.trace(state@I_L)
@@ -433,7 +512,9 @@ def perfect_stab_circuit(n_cycles, n_shots, gate_times={}, T1=40e3, T2=60e3,
     syndrome, and can be seen as an (unreachable) upper limit of the circuit.
 
     Args:
-        See fidelity_from_scratch for detailed docstring.
+        See fidelity_from_scratch for detailed docstring. As there, density
+        matrix snapshots are run with a single shot when no measurement
+        precedes them, which here only holds for n_cycles=0.
 
     Returns:
         fid (list): The average fidelity after each stabilizer cycle. If project=True,
@@ -467,13 +548,11 @@ def perfect_stab_circuit(n_cycles, n_shots, gate_times={}, T1=40e3, T2=60e3,
     # Calculate cycle time
     cycle_time = 8*single_qubit_gate_time + 16 * \
         two_qubit_gate_time + 4*measure_time + feedback_time
-    time = {}
-    for i in range(n_cycles+1):
-        if data_process_type == 'recovery':
-            key = snapshot_type + '_' + str(i)
-        elif data_process_type == 'post_select':
-            key = snapshot_type + '_con_' + str(i)
-        time[key] = i*cycle_time
+    times_arr = np.arange(n_cycles+1)*cycle_time
+    if data_process_type == 'recovery':
+        time = {f'{snapshot_type}_{i}': t for i, t in enumerate(times_arr)}
+    elif data_process_type == 'post_select':
+        time = {f'{snapshot_type}_con_{i}': t for i, t in enumerate(times_arr)}
 
     # Check the data processing method for settings
     if data_process_type == 'recovery':
@@ -497,10 +576,13 @@ def perfect_stab_circuit(n_cycles, n_shots, gate_times={}, T1=40e3, T2=60e3,
     add_snapshot_to_circuit(circ, snapshot_type=snapshot_type, current_cycle=0, qubits=qb,
                             conditional=conditional, pauliop=pauliop,
                             include_barriers=include_barriers)
-    thrm_relax = thermal_relaxation_error(T1, T2, cycle_time).to_instruction()
+    thrm_relax = thermal_relaxation_instruction(T1, T2, cycle_time)
     for reg in circ.qubits:
         circ.append(thrm_relax, [reg])
 
+    # The cycle is built anew each iteration rather than reused as a template,
+    # since its syndrome bits, recovery conditions and snapshot labels all
+    # depend on the cycle number
     for current_cycle in range(n_cycles):
         circ.compose(get_stabilizer_cycle(registers, reset=reset, recovery=recovery,
                                                 current_cycle=current_cycle, current_step=0,
@@ -513,34 +595,40 @@ def perfect_stab_circuit(n_cycles, n_shots, gate_times={}, T1=40e3, T2=60e3,
     circ.measure(qb, readout)
 
     # Run the circuit
-    results = execute(circ, Aer.get_backend('qasm_simulator'),
-                      noise_model=None, shots=n_shots).result()
+    if (snapshot_type == 'dm' or snapshot_type == 'density_matrix') and \
+            not conditional and _shot_independent(circ):
+        effective_shots = 1
+    else:
+        effective_shots = n_shots
+    results = _SIM.run(circ, noise_model=None, shots=effective_shots,
+                       memory=False).result()
+    data = results.data(circ)
 
-    trivial = get_encoded_state(theta, phi, include_ancillas=None)
+    trivial = _get_trivial_state(theta, phi)
     fidelities = []
     P_Ls = []
     if data_process_type == 'recovery':
         if snapshot_type == 'dm' or snapshot_type == 'density_matrix':
-            for current_cycle in range(n_cycles+1):
-                state = results.data(circ)['dm_' + str(current_cycle)]
+            states = []
+            for key in [f'dm_{i}' for i in range(n_cycles+1)]:
+                state = data[key]
                 if project:
                     state, P_L = project_dm_to_logical_subspace_V2(
                         state, return_P_L=True)
                     P_Ls.append(P_L)
-                fidelities.append(state_fidelity(state, trivial))
+                states.append(state)
+            fidelities = pure_state_fidelities(states, trivial).tolist()
             if project:
                 return fidelities, P_Ls, time
         elif snapshot_type == 'exp' or snapshot_type == 'expectation_value':
-            for current_cycle in range(n_cycles+1):
-                fidelities.append(results.data()['exp_' + str(current_cycle)])
+            fidelities = [data[f'exp_{i}'] for i in range(n_cycles+1)]
         return fidelities, time
 
     elif data_process_type == 'post_select':
         # Get the fidelity for each cycle
         if snapshot_type == 'dm' or snapshot_type == 'density_matrix':
-            fidelities = [state_fidelity(post_selected_state, trivial) for
-                          post_selected_state in get_trivial_post_select_den_mat(
-                results, n_cycles)]
+            fidelities = pure_state_fidelities(
+                get_trivial_post_select_den_mat(results, n_cycles), trivial).tolist()
         elif snapshot_type == 'exp' or snapshot_type == 'expectation_value':
             fidelities = [post_selected_state for
                           post_selected_state in get_trivial_exp_value(
@@ -664,5 +752,24 @@ def overlap_with_subspace(rho, basis):
     basis = basis if isinstance(basis, list) else [basis]
     P = 0
     for basis_vector in basis:
-        P += state_fidelity(rho, basis_vector)
+        P += pure_state_fidelity(rho, np.asarray(basis_vector))
     return P
+
+
+def fidelity_mm(rho, sigma):
+    """Fidelity between two mixed states, F = Tr[sqrt(rho sigma)]^2.
+
+    Uses the eigenvalues of rho @ sigma (which are real and non-negative), so
+    only one eigendecomposition is needed instead of the two matrix square
+    roots in the standard Tr[sqrt(sqrt(rho) sigma sqrt(rho))]^2. For a pure
+    state, use <psi|rho|psi> directly instead.
+
+    Args:
+        rho (ndarray/DensityMatrix): First density matrix.
+        sigma (ndarray/DensityMatrix): Second density matrix.
+
+    Returns:
+        float: The state fidelity.
+    """
+    ev = np.linalg.eigvals(np.asarray(rho) @ np.asarray(sigma))
+    return float(np.sum(np.sqrt(np.clip(ev.real, 0, None)))**2)
@@ -9,10 +9,10 @@ from qiskit.providers.aer.noise.errors.standard_errors import thermal_relaxation
 from qiskit.quantum_info.operators.symplectic.pauli import Pauli
 from qiskit.circuit.quantumregister import QuantumRegister
 from qiskit.circuit.quantumcircuit import QuantumCircuit
-from qiskit.execute_function import execute
 from qiskit.providers.aer.library import save_density_matrix
 from qiskit import Aer
 from simulator_program.stabilizers import add_snapshot_to_circuit, logical_states
+from simulator_program.custom_noise_models import thermal_relaxation_instruction
 from qiskit.quantum_info.states.measures import state_fidelity
 import scipy
 from qiskit.quantum_info import Statevector
@@ -34,22 +34,20 @@ def get_idle_single_qubit(snapshot_times, snapshot_type='dm', T1=40e3, T2=60e3,
     initial_state = np.cos(theta/2)*np.array((1,0)) + \
         np.exp(1j*phi)*np.sin(theta/2)*np.array((0,1))
     circ.set_density_matrix(initial_state)
+    pauli = Pauli(pauliop)
     time_passed = 0
     for i, time in enumerate(snapshot_times):
         time_diff = time-time_passed
         if time_diff > 0:
-            thrm_relax = thermal_relaxation_error(
-                T1, T2, time_diff).to_instruction()
-
+            thrm_relax = thermal_relaxation_instruction(T1, T2, time_diff)
             circ.append(thrm_relax, [qb[0]])
         add_snapshot_to_circuit(circ, snapshot_type, i, [
-                                qb[0]], conditional=False, pauliop=pauliop)
+                                qb[0]], conditional=False, pauliop=pauli)
         time_passed = time
 
     simulator = Aer.get_backend('aer_simulator')
     simulator.set_option('method', 'density_matrix')
-    results = execute(circ, simulator,
-                      noise_model=None, shots=1).result()
+    results = simulator.run(circ, noise_model=None, shots=1).result()
     return results
 
 
@@ -65,23 +63,22 @@ def get_idle_encoded_513(snapshot_times, snapshot_type='dm', T1=40e3, T2=60e3,
     initial_state = np.cos(theta/2)*logical_0 + \
         np.exp(1j*phi)*np.sin(theta/2)*logical_1
     circ.set_density_matrix(initial_state)
+    pauli = Pauli(pauliop)
     time_passed = 0
     for i, time in enumerate(snapshot_times):
         time_diff = time-time_passed
         if time_diff > 0:
-            thrm_relax = thermal_relaxation_error(
-                T1, T2, time_diff).to_instruction()
+            thrm_relax = thermal_relaxation_instruction(T1, T2, time_diff)
             for qubit in circ.qubits:
                 circ.append(thrm_relax, [qubit])
 
         add_snapshot_to_circuit(circ, snapshot_type, i,
-                                circ.qubits, conditional=False, pauliop=pauliop)
+                                circ.qubits, conditional=False, pauliop=pauli)
         time_passed = time
 
     simulator = Aer.get_backend('aer_simulator')
     simulator.set_option('method', 'density_matrix')
-    results = execute(circ, simulator,
-                      noise_model=None, shots=1).result()
+    results = simulator.run(circ, noise_model=None, shots=1).result()
     return results
 
 def get_idle_encoded_422(snapshot_times, snapshot_type='dm', T1=40e3, T2=60e3,
@@ -94,21 +91,20 @@ def get_idle_encoded_422(snapshot_times, snapshot_type='dm', T1=40e3, T2=60e3,
     circ = QuantumCircuit(4)
     initial_state = get_encoded_state_422(initial_state, include_ancillas=None)
     circ.set_density_matrix(initial_state)
+    pauli = Pauli(pauliop)
     time_passed = 0
     for i, time in enumerate(snapshot_times):
         time_diff = time-time_passed
         if time_diff > 0:
-            thrm_relax = thermal_relaxation_error(
-                T1, T2, time_diff).to_instruction()
+            thrm_relax = thermal_relaxation_instruction(T1, T2, time_diff)
             for qubit in circ.qubits:
                 circ.append(thrm_relax, [qubit])
 
         add_snapshot_to_circuit(circ, snapshot_type, i,
-                                circ.qubits, conditional=False, pauliop=pauliop)
+                                circ.qubits, conditional=False, pauliop=pauli)
         time_passed = time
 
     simulator = Aer.get_backend('aer_simulator')
     simulator.set_option('method', 'density_matrix')
-    results = execute(circ, simulator,
-                      noise_model=None, shots=1).result()
+    results = simulator.run(circ, noise_model=None, shots=1).result()
     return results
\ No newline at end of file
@@ -208,8 +208,8 @@ def get_repeated_stabilization(registers, n_cycles=1, reset=True, recovery=False
                               (optional) delay time between cycles. Default to 0.
         pauliop (str): Five character string corresponding to the five-qubit
                        expectation value to measure (if snapshot_type is set to
-                       expectation value or expectation value variance).
-                       Defaults to 'ZZZZZ'.
+                       expectation value or expectation value variance). Can
+                       also be given as a Pauli object. Defaults to 'ZZZZZ'.
         device: Whether to conform the circuit to a specific device layout. 
                 Available options are None or 'double_diamond'. If set to None,
                 it will assume full connectivity. Note that this can also be
@@ -225,6 +225,10 @@ def get_repeated_stabilization(registers, n_cycles=1, reset=True, recovery=False
 
     circ = get_empty_stabilizer_circuit(registers)
 
+    # Parse the operator once, rather than in every snapshot
+    if not isinstance(pauliop, Pauli):
+        pauliop = Pauli(pauliop)
+
     for current_cycle in range(n_cycles):
         if idle_delay == 'before':
             add_delay_marker(circ, registers, idle_snapshots, snapshot_type,
@@ -287,7 +291,8 @@ label_counter = Int(0)
 def add_snapshot_to_circuit(circ, snapshot_type, current_cycle=label_counter,
                             qubits=None, conditional=False,
                             pauliop='ZZZZZ', include_barriers=True, **kwargs):
-    """Appends a snapshot to circuit."""
+    """Appends a snapshot to circuit. pauliop can be given either as a string
+    or as an already constructed Pauli object."""
 
     # Intended functionality: Set label_counter to current_cycle if given
     # if current_cycle != label_counter:
@@ -314,10 +319,14 @@ def add_snapshot_to_circuit(circ, snapshot_type, current_cycle=label_counter,
                     circ.save_density_matrix(
                         qubits, label=snap_label, conditional=con)
                 elif snap == 'exp' or snap == 'expectation_value':
-                    circ.save_expectation_value(Pauli(pauliop), qubits,
+                    if not isinstance(pauliop, Pauli):
+                        pauliop = Pauli(pauliop)
+                    circ.save_expectation_value(pauliop, qubits,
                                                 label=snap_label, conditional=con)
                 elif snap == 'expvar' or snap == 'expectation_value_variance':
-                    circ.save_expectation_value_variance(Pauli(pauliop), qubits,
+                    if not isinstance(pauliop, Pauli):
+                        pauliop = Pauli(pauliop)
+                    circ.save_expectation_value_variance(pauliop, qubits,
                                                          label=snap_label, conditional=con)
                 if include_barriers:
                     circ.barrier()
@@ -8,6 +8,7 @@
 import numpy as np
 import scipy
 import itertools
+from joblib import Parallel, delayed
 from qiskit import *
 #from qiskit.visualization import plot_histogram
 
@@ -33,6 +34,7 @@ if __package__:
     from .post_select import *
     from .post_process import *
     from .idle_noise import *
+    from .data_analysis_tools import pure_state_fidelity, pure_state_fidelities
 else:
     from custom_noise_models import (thermal_relaxation_model,
                                      thermal_relaxation_model_V2,
@@ -44,8 +46,12 @@ else:
     from post_select import *
     from post_process import *
     from idle_noise import *
+    from data_analysis_tools import pure_state_fidelity, pure_state_fidelities
 # %%
 
+# Simulator backend shared by all runs that do not go through default_execute
+_SIM = Aer.get_backend('qasm_simulator')
+
 
 def extend_standard_gate_times(gate_times={}):
     # TODO: move this to custom_noise_model.py?
@@ -92,11 +98,60 @@ def default_execute(circ, shots=None, noise_model=None, gate_times={}, T1=40e3,
     return simulator.run(circ, shots=shots).result()
 
 
+def _get_stabilizer_circuit(n_cycles, reset=True, data_process_type='recovery',
+                            transpile=True, snapshot_type='dm', device=None,
+                            device_properties=WACQT_device_properties,
+                            encoding=True, theta=0, phi=0, pauliop='ZZZZZ',
+                            simulator_type='density_matrix', **kwargs):
+    """Builds (and optionally transpiles) the noiseless stabilizer circuit used
+    by fidelity_from_scratch. It does not depend on T1, T2 or gate times, so
+    the same circuit can be reused across a sweep over those."""
+    # Check the data processing method for settings
+    if data_process_type == 'recovery':
+        recovery = True
+        conditional = False
+    elif data_process_type == 'post_select':
+        recovery = False
+        conditional = True
+    elif data_process_type == 'empty_circuit':
+        recovery = False
+        conditional = False
+    elif data_process_type == 'post_process':
+        recovery = False
+        conditional = True
+    else:
+        recovery = False
+        conditional = False
+
+    # Registers
+    qb = QuantumRegister(5, 'code_qubit')
+    an = AncillaRegister(2, 'ancilla_qubit')
+    cr = get_classical_register(
+        n_cycles, reset=reset, recovery=recovery, flag=False)
+    readout = ClassicalRegister(5, 'readout')
+    registers = StabilizerRegisters(qb, an, cr, readout)
+
+    # Circuits
+    circ = get_full_stabilizer_circuit(registers, n_cycles=n_cycles, reset=reset,
+                                       recovery=recovery, flag=False,
+                                       snapshot_type=snapshot_type,
+                                       conditional=conditional,
+                                       encoding=encoding, theta=theta, phi=phi,
+                                       pauliop=pauliop, device=device,
+                                       simulator_type=simulator_type, final_measure=False, **kwargs)
+
+    if transpile:
+        circ = shortest_transpile_from_distribution(circ, print_cost=False,
+                                                    **device_properties)
+
+    return circ
+
+
 def fidelity_from_scratch(n_cycles, n_shots, gate_times={}, T1=40e3, T2=60e3,
                           reset=True, data_process_type='recovery', idle_noise=True, transpile=True,
                           snapshot_type='dm', device=None, device_properties=WACQT_device_properties,
                           encoding=True, theta=0, phi=0, pauliop='ZZZZZ', simulator_type='density_matrix',
-                          project=False, **kwargs):
+                          project=False, circ_template=None, **kwargs):
     """TODO: Update this description
 
     Get the fidelity of a certain setup/configuration from only its
@@ -131,6 +186,10 @@ def fidelity_from_scratch(n_cycles, n_shots, gate_times={}, T1=40e3, T2=60e3,
                               snapshots at times matching that of a 'normal'
                               stabilizer circuit with given gate times. Defaults
                               to False if left empty.
+        circ_template (QuantumCircuit): Circuit from _get_stabilizer_circuit
+                                        with the same settings. If given, a
+                                        copy of it is used instead of building
+                                        and transpiling the circuit again.
 
     Returns:
         fid (list): The average fidelity after each stabilizer cycle.
@@ -140,23 +199,6 @@ def fidelity_from_scratch(n_cycles, n_shots, gate_times={}, T1=40e3, T2=60e3,
 
     full_gate_times = extend_standard_gate_times(gate_times)
 
-    # Check the data processing method for settings
-    if data_process_type == 'recovery':
-        recovery = True
-        conditional = False
-    elif data_process_type == 'post_select':
-        recovery = False
-        conditional = True
-    elif data_process_type == 'empty_circuit':
-        recovery = False
-        conditional = False
-    elif data_process_type == 'post_process':
-        recovery = False
-        conditional = True
-    else:
-        recovery = False
-        conditional = False
-
     # TODO: Delete these
     # Noise model
     # noise_model = thermal_relaxation_model_V2(
@@ -172,26 +214,18 @@ def fidelity_from_scratch(n_cycles, n_shots, gate_times={}, T1=40e3, T2=60e3,
     # noise_model = thermal_relaxation_model_per_qb(
     #     T1=[1,1]*7, T2=[1,1]*7, gate_times=full_gate_times)
 
-    # Registers
-    qb = QuantumRegister(5, 'code_qubit')
-    an = AncillaRegister(2, 'ancilla_qubit')
-    cr = get_classical_register(
-        n_cycles, reset=reset, recovery=recovery, flag=False)
-    readout = ClassicalRegister(5, 'readout')
-    registers = StabilizerRegisters(qb, an, cr, readout)
-
-    # Circuits
-    circ = get_full_stabilizer_circuit(registers, n_cycles=n_cycles, reset=reset,
-                                       recovery=recovery, flag=False,
-                                       snapshot_type=snapshot_type,
-                                       conditional=conditional,
+    if circ_template is not None:
+        # Only the noise depends on T1, T2 and gate times, so reuse the circuit
+        circ = circ_template.copy()
+    else:
+        circ = _get_stabilizer_circuit(n_cycles, reset=reset,
+                                       data_process_type=data_process_type,
+                                       transpile=transpile,
+                                       snapshot_type=snapshot_type, device=device,
+                                       device_properties=device_properties,
                                        encoding=encoding, theta=theta, phi=phi,
-                                       pauliop=pauliop, device=device,
-                                       simulator_type=simulator_type, final_measure=False, **kwargs)
-
-    if transpile:
-        circ = shortest_transpile_from_distribution(circ, print_cost=False,
-                                                    **device_properties)
+                                       pauliop=pauliop,
+                                       simulator_type=simulator_type, **kwargs)
 
     # Get the correct (no errors) state
     trivial = get_encoded_state(theta, phi, include_ancillas=None)
@@ -203,14 +237,15 @@ def fidelity_from_scratch(n_cycles, n_shots, gate_times={}, T1=40e3, T2=60e3,
         time = get_circuit_time(circ, full_gate_times)
         circ = get_empty_noisy_circuit_v3(circ, time, full_gate_times,
                                           T1=T1, T2=T2)
-        results = default_execute(circ, n_shots)
+        results = default_execute(circ, n_shots,
+                                  simulator_method=simulator_type)
 
         # Calculate fidelity at each snapshot
         fidelities = []
         if snapshot_type == 'dm' or snapshot_type == 'density_matrix':
             for current_cycle in range(n_cycles+1):
                 state = results.data()['dm_' + str(current_cycle)]
-                fidelities.append(state_fidelity(state, trivial))
+                fidelities.append(pure_state_fidelity(state, trivial))
         elif snapshot_type == 'exp' or snapshot_type == 'expectation_value':
             for current_cycle in range(n_cycles+1):
                 fidelities.append(results.data()['exp_' + str(current_cycle)])
@@ -224,19 +259,21 @@ def fidelity_from_scratch(n_cycles, n_shots, gate_times={}, T1=40e3, T2=60e3,
     else:
         time = get_circuit_time(circ=circ, gate_times=full_gate_times)
 
-    results = default_execute(circ, n_shots)
+    results = default_execute(circ, n_shots, simulator_method=simulator_type)
     
     if data_process_type == 'recovery' or data_process_type == 'none':
         fidelities = []  # If project = True, this contains F_L
         P_Ls = []
         if snapshot_type == 'dm' or snapshot_type == 'density_matrix':
-            for current_cycle in range(label_counter.value):
+            # label_counter is not set when reusing a circuit template
+            n_snapshots = sum(key.startswith('dm_') for key in results.data())
+            for current_cycle in range(n_snapshots):
                 state = results.data()['dm_' + str(current_cycle)]
                 if project:
                     state, P_L = project_dm_to_logical_subspace_V2(
                         state, return_P_L=True)
                     P_Ls.append(np.real(P_L))
-                fidelities.append(state_fidelity(state, trivial))
+                fidelities.append(pure_state_fidelity(state, trivial))
             if project:
                 return fidelities, P_Ls, time
         elif snapshot_type == 'exp' or snapshot_type == 'expectation_value':
@@ -260,7 +297,7 @@ def fidelity_from_scratch(n_cycles, n_shots, gate_times={}, T1=40e3, T2=60e3,
                     state, P_L = project_dm_to_logical_subspace_V2(
                         state, return_P_L=True)
                     P_Ls.append(np.real(P_L))
-                fidelities.append(state_fidelity(state, trivial))
+                fidelities.append(pure_state_fidelity(state, trivial))
             if project:
                 return fidelities, P_Ls, select_counts, time
         elif snapshot_type == 'exp' or snapshot_type == 'expectation_value':
@@ -327,6 +364,7 @@ def get_idle_single_qubit(snapshot_times, snapshot_type='dm', T1=40e3, T2=60e3,
     circ.rx(theta, qb)
     circ.rz(phi, qb)
     circ.save_density_matrix(qb, label='start')
+    pauli = Pauli(pauliop)
     time_passed = 0
     index = 0
     for key in snapshot_times:
@@ -340,7 +378,7 @@ def get_idle_single_qubit(snapshot_times, snapshot_type='dm', T1=40e3, T2=60e3,
             circ.save_density_matrix(qb, label='snap_'+str(index))
         elif snapshot_type == 'exp' or snapshot_type == 'expectation_value':
             circ.save_expectation_value(
-                Pauli(pauliop), qb, label='snap_'+str(index))
+                pauli, qb, label='snap_'+str(index))
         time_passed = snapshot_times[key]
         index += 1
     return circ
@@ -394,18 +432,19 @@ def fid_single_qubit(n_cycles, n_shots, gate_times={}, snapshot_type='dm',
 
     circ_single = get_idle_single_qubit(time, snapshot_type, T1, T2,
                                         theta=theta, phi=phi, pauliop=pauliop)
-    results = execute(circ_single, Aer.get_backend('qasm_simulator'),
-                      noise_model=None, shots=n_shots).result()
+    results = _SIM.run(circ_single, noise_model=None, shots=n_shots).result()
     fidelities = [1.0]  # The initial state
+    data = results.data()
+    keys = ['snap_'+str(i+1) for i in range(len(time)-2)]
 
     if snapshot_type == 'dm' or snapshot_type == 'density_matrix':
-        trivial = results.data()['start']
-        for i in range(len(time)-2):
-            current_state = results.data()['snap_'+str(i+1)]
-            fidelities.append(state_fidelity(current_state, trivial))
+        # The initial state is pure, so extract it as a ket once and compute
+        # all fidelities as <psi|rho|psi> in one contraction
+        _, eigvecs = np.linalg.eigh(np.asarray(data['start']))
+        psi = eigvecs[:, -1]
+        fidelities.extend(pure_state_fidelities([data[key] for key in keys], psi))
     elif snapshot_type == 'exp' or snapshot_type == 'expectation_value':
-        for i in range(len(time)-2):
-            fidelities.append(results.data()['snap_'+str(i+1)])
+        fidelities.extend(data[key] for key in keys)
     return fidelities, time
 
 
@@ -433,13 +472,11 @@ def encoding_fidelity(n_shots, gate_times={}, T1=40e3, T2=60e3,
     # Circuits
     circ = get_empty_stabilizer_circuit(registers)
 
-    # Initial state
-    # TODO: Better looking solution
-    extra_qubits = np.zeros(2**6)
-    extra_qubits[0] = 1.0
-    zero_state = np.kron(extra_qubits, np.array([1, 0]))
-    one_state = np.kron(extra_qubits, np.array([0, 1]))
-    psi = np.cos(theta/2)*zero_state + np.exp(1j*phi)*np.sin(theta/2)*one_state
+    # Initial state, with qubit 0 in the input state and the others in |0>.
+    # Qubit 0 is the least significant bit, so only indices 0 and 1 are nonzero
+    psi = np.zeros(2**7, dtype=complex)
+    psi[0] = np.cos(theta/2)
+    psi[1] = np.exp(1j*phi)*np.sin(theta/2)
     circ.set_density_matrix(psi)
     psi = np.cos(theta/2)*logical_states(include_ancillas=None)[0] + np.exp(
         1j*phi)*np.sin(theta/2)*logical_states(include_ancillas=None)[1]
@@ -459,12 +496,6 @@ def encoding_fidelity(n_shots, gate_times={}, T1=40e3, T2=60e3,
     add_snapshot_to_circuit(circ, snapshot_type=snapshot_type, current_cycle=0, qubits=qubits,
                             pauliop=pauliop, include_barriers=True)
 
-    # Trivial state
-    if snapshot_type == 'dm' or snapshot_type == 'density_matrix':
-        trivial_res = execute(circ, Aer.get_backend(
-            'qasm_simulator'), shots=1).result()
-        trivial = trivial_res.data()['dm_0']
-
     if idle_noise:
         circ, time = add_idle_noise_to_circuit(circ, gate_times=full_gate_times,
                                                T1=T1, T2=T2, return_time=True)
@@ -474,10 +505,10 @@ def encoding_fidelity(n_shots, gate_times={}, T1=40e3, T2=60e3,
     noise_model = thermal_relaxation_model_V2(
         T1=T1, T2=T2, gate_times=full_gate_times)
     # noise_model = None
-    results = execute(circ, Aer.get_backend('qasm_simulator'),
-                      noise_model=noise_model, shots=n_shots).result()
+    results = _SIM.run(circ, noise_model=noise_model, shots=n_shots).result()
     if snapshot_type == 'dm' or snapshot_type == 'density_matrix':
         state = results.data()['dm_0']
+        # Compared to the ideal state directly, without a noiseless reference run
         true_state = psi
         if project:
             state, P_L = project_dm_to_logical_subspace_V2(
@@ -499,52 +530,77 @@ def monoExp(t, T, c, A):
     return (A-c) * np.exp(-t/T) + c
 
 
-def _get_array_indexes(index, sweep_lengths):
-    """Returns a tuple of indexes for the error_array in sweep_parameter_space,
-    given a single index"""
-    indexes = np.zeros(len(sweep_lengths), dtype=int)
-    indexes[-1] = index
-    for i in reversed(range(len(sweep_lengths)-1)):
-        if indexes[i+1] >= sweep_lengths[i+1]:
-            indexes[i] = indexes[i+1] // sweep_lengths[i+1]
-            indexes[i+1] -= indexes[i] * sweep_lengths[i+1]
-    return tuple(indexes)
-
-
 def get_error_rate(fidelity, time=None):
     """Calculates the logical error rate from a list of fidelities"""
 
     n_cycles = len(fidelity)-1
-    x_D = np.ones((n_cycles, 2))
-    for i in range(n_cycles):
-        if time is not None:
-            try:
-                x_D[i][1] = time['exp_'+str(i+1)]*1e-3
-            except:
-                x_D[i][1] = time['dm_'+str(i+1)]*1e-3
-        else:
-            x_D[i][1] += i
+    if time is not None:
+        key = 'exp_' if 'exp_1' in time else 'dm_'
+        x = np.array([time[key+str(i+1)] for i in range(n_cycles)])*1e-3
+    else:
+        x = np.arange(1, n_cycles+1)
+    x_D = np.column_stack((np.ones(n_cycles), x))
     y = np.log(np.reshape(np.asarray(fidelity[1:]), (n_cycles, 1)))
-    theta = np.dot(np.dot(np.linalg.inv(np.dot(x_D.T, x_D)), x_D.T), y)
+    theta = np.linalg.lstsq(x_D, y, rcond=None)[0]
 
-    MSE = 0.
-    for cycle in range(n_cycles):
-        y_pred = np.exp(theta[0]) * np.exp((cycle+1)*theta[1])
-        MSE += (y_pred-fidelity[cycle+1])**2
+    cycles = np.arange(1, n_cycles+1)
+    y_pred = np.exp(theta[0]) * np.exp(cycles*theta[1])
+    MSE = np.sum((y_pred-np.asarray(fidelity[1:]))**2)
 
     # TODO: Only return theta[1] maybe?
     return theta, MSE
 
 
+def _one_point(params, n_cycles, n_shots, single_qubit, perfect_stab,
+               normalize=False, circ_template=None, **kwargs):
+    """Simulates a single point of sweep_parameter_space and returns the fitted
+    lifetime together with its variance."""
+    gate_times = GateTimes(params[2], params[3],
+                           {'u1': 0, 'z': 0, 'measure': params[4], 'feedback': params[5]})
+
+    if single_qubit:
+        fid, time = fid_single_qubit(n_cycles, n_shots, T1=params[0],
+                                     T2=params[1], gate_times=gate_times, **kwargs)
+
+        # Normalize data if needed
+        if normalize:
+            for i in range(len(fid)):
+                fid[i] = 2.*fid[i] - 1.
+    elif perfect_stab:
+        fid, time = perfect_stab_circuit(n_cycles, n_shots, gate_times=gate_times,
+                                         T1=params[0], T2=params[1], reset=True, snapshot_type='exp')
+    else:
+        fid, time = fidelity_from_scratch(n_cycles, n_shots, T1=params[0],
+                                          T2=params[1], gate_times=gate_times,
+                                          circ_template=circ_template, **kwargs)
+
+    # From fidelities, estimate lifetime
+    # Old version
+    # if time_axis:
+    #    error_rate, MSE = get_error_rate(fid, time)
+    # else:
+    #    error_rate, MSE = get_error_rate(fid)
+    time_list = list(time.values())[1:-1]
+
+    p0 = (params[0], 0, 0.9)  # start with values near those we expect
+    pars, cov = scipy.optimize.curve_fit(monoExp, time_list, fid[1:], p0)
+    T, c, A = pars
+    return T, cov[0][0]
+
+
 def sweep_parameter_space(T1, T2, single_qubit_gate_time, two_qubit_gate_time,
                           measure_time, feedback_time, n_cycles=8, n_shots=2048, single_qubit=False, save=None,
-                          time_axis=False, perfect_stab=False, **kwargs):
+                          time_axis=False, perfect_stab=False, n_jobs=-1, **kwargs):
     """
     DEPRECATED
     Use scripts/functions in T1T2_sweep.py or gate_times_test.py
 
     Calculate the logical error rate across a variety of parameters
     TODO: Add default values for n_cycles and n_shots that are reasonable
+
+    The parameter points are simulated in n_jobs parallel processes with
+    joblib (-1 uses all cores). Each simulation also runs on Aer's own thread
+    pool, so lower n_jobs if the workers oversubscribe the CPU.
     """
 
     # Check for theta and phi in kwargs
@@ -566,51 +622,36 @@ def sweep_parameter_space(T1, T2, single_qubit_gate_time, two_qubit_gate_time,
     error_array = np.zeros(sweep_lengths)
     var_array = np.zeros(sweep_lengths)
 
-    # Get all combinations of parameters
-    index = 0
-    for params in itertools.product(*noise_parameters):
-
-        gate_times = GateTimes(params[2], params[3],
-                               {'u1': 0, 'z': 0, 'measure': params[4], 'feedback': params[5]})
-
-        # Skip cases where T2 > 2*T1
-        if params[1] > 2*params[0]:
-            index += 1
-            continue
-
-        if single_qubit:
-            fid, time = fid_single_qubit(n_cycles, n_shots, T1=params[0],
-                                         T2=params[1], gate_times=gate_times, **kwargs)
-
-            # Normalize data if needed
-            # TODO: Better solution? Now it checks if input state is |+>
-            if theta == np.pi/2 and phi == np.pi/2:
-                for i in range(len(fid)):
-                    fid[i] = 2.*fid[i] - 1.
-        elif perfect_stab:
-            fid, time = perfect_stab_circuit(n_cycles, n_shots, gate_times=gate_times,
-                                             T1=params[0], T2=params[1], reset=True, snapshot_type='exp')
-        else:
-            fid, time = fidelity_from_scratch(n_cycles, n_shots, T1=params[0],
-                                              T2=params[1], gate_times=gate_times, **kwargs)
-
-        # From fidelities, estimate lifetime
-        # Old version
-        # if time_axis:
-        #    error_rate, MSE = get_error_rate(fid, time)
-        # else:
-        #    error_rate, MSE = get_error_rate(fid)
-        time_list = list(time.values())[1:-1]
-
-        p0 = (params[0], 0, 0.9)  # start with values near those we expect
-        pars, cov = scipy.optimize.curve_fit(monoExp, time_list, fid[1:], p0)
-        T, c, A = pars
-
-        array_indexes = _get_array_indexes(index, sweep_lengths)
+    # Get all combinations of parameters, skipping cases where T2 > 2*T1,
+    # together with their positions in error_array
+    points = [(index, params) for index, params in
+              enumerate(itertools.product(*noise_parameters))
+              if params[1] <= 2*params[0]]
+    array_indexes = np.unravel_index(
+        np.array([index for index, _ in points], dtype=int), sweep_lengths)
+
+    # TODO: Better solution? Now it checks if input state is |+>
+    normalize = theta == np.pi/2 and phi == np.pi/2
+
+    # The stabilizer circuit is the same for every point, so build and
+    # transpile it only once
+    circ_template = None
+    if not single_qubit and not perfect_stab:
+        circ_template = _get_stabilizer_circuit(n_cycles, **kwargs)
+
+    # Each parameter tuple is an independent simulation of a small circuit,
+    # so run them in parallel processes rather than one after another
+    sweep_results = Parallel(n_jobs=n_jobs, backend='loky')(
+        delayed(_one_point)(params, n_cycles, n_shots, single_qubit,
+                            perfect_stab, normalize,
+                            circ_template=circ_template, **kwargs)
+        for _, params in points)
+
+    if points:
+        T, var = zip(*sweep_results)
         error_array[array_indexes] = T
         #error_array[array_indexes] = error_rate[1]
-        var_array[array_indexes] = cov[0][0]
-        index += 1
+        var_array[array_indexes] = var
 
     # Save results to file
     # TODO: Save as txt instead? Make it both readable and have the parameters used
@@ -693,8 +734,7 @@ def perfect_stab_circuit(n_cycles, n_shots, gate_times={}, T1=40e3, T2=60e3,
     circ.measure(qb, readout)
 
     # Run the circuit
-    results = execute(circ, Aer.get_backend('qasm_simulator'),
-                      noise_model=None, shots=n_shots).result()
+    results = _SIM.run(circ, noise_model=None, shots=n_shots).result()
 
     trivial = get_encoded_state(theta, phi, include_ancillas=None)
     fidelities = []
@@ -707,7 +747,7 @@ def perfect_stab_circuit(n_cycles, n_shots, gate_times={}, T1=40e3, T2=60e3,
                     state, P_L = project_dm_to_logical_subspace_V2(
                         state, return_P_L=True)
                     P_Ls.append(P_L)
-                fidelities.append(state_fidelity(state, trivial))
+                fidelities.append(pure_state_fidelity(state, trivial))
             if project:
                 return fidelities, P_Ls, time
         elif snapshot_type == 'exp' or snapshot_type == 'expectation_value':
@@ -718,7 +758,7 @@ def perfect_stab_circuit(n_cycles, n_shots, gate_times={}, T1=40e3, T2=60e3,
     elif data_process_type == 'post_select':
         # Get the fidelity for each cycle
         if snapshot_type == 'dm' or snapshot_type == 'density_matrix':
-            fidelities = [state_fidelity(post_selected_state, trivial) for
+            fidelities = [pure_state_fidelity(post_selected_state, trivial) for
                           post_selected_state in get_trivial_post_select_den_mat(
                 results, n_cycles)]
         elif snapshot_type == 'exp' or snapshot_type == 'expectation_value':
@@ -1,4 +1,5 @@
 # %% Import modules
+from joblib import Parallel, delayed
 from qiskit.aqua.utils import get_subsystems_counts
 import matplotlib.pyplot as plt
 import numpy as np
@@ -10,6 +11,7 @@ from qiskit.quantum_info import state_fidelity
 from simulator_program.custom_noise_models import thermal_relaxation_model_V2
 from simulator_program.custom_transpiler import *
 from simulator_program.stabilizers import *
+from simulator_program.data_analysis_tools import fidelity_mm
 
 # %% =================  Testing noise model + stabilizer ======================
 # DEFINE AND TRANSPILE THE CIRCUIT
@@ -83,9 +85,25 @@ for optimization_level in optimization_levels:
 #     )
 
 # %% Functions for analyzing results
+# Statevector simulator for the shot-based fidelity sweeps. The shots are
+# batched into a single kernel on GPU if one is available, otherwise it runs
+# as the default statevector simulator. The 7 qubit limit covers all circuits
+# in circuit_list (5 code qubits and 2 ancillas, or the 7 qubit chip).
+shot_simulator = Aer.get_backend('aer_simulator_statevector')
+if 'GPU' in shot_simulator.available_devices():
+    shot_simulator.set_options(device='GPU', batched_shots_gpu=True,
+                               batched_shots_gpu_max_qubits=7)
+
+
 def select_no_errors(mem):
-    '''Gives array of booleans corresponding to the shots without errors'''
-    return np.array([int(item[6:10]) for item in mem]) == 0
+    '''Gives array of booleans corresponding to the shots without errors,
+    i.e. where the syndrome (characters 6-9 of the memory string) is zero'''
+    # Each shot as an integer, with the register separators removed
+    arr = np.array([int(item.replace(' ', ''), 2) for item in mem],
+                   dtype=np.uint64)
+    # Position of the last syndrome bit, counted from the least significant bit
+    shift = len(mem[0].replace(' ', '')) - len(mem[0][:10].replace(' ', ''))
+    return ((arr >> np.uint64(shift)) & np.uint64(0xF)) == 0
 
 
 def get_fidelity_data(circ, param_list, n_shots=2048,
@@ -113,7 +131,7 @@ def get_fidelity_data(circ, param_list, n_shots=2048,
     # Run the circuit
     results = execute(
         circ,
-        Aer.get_backend('qasm_simulator'),
+        shot_simulator,
         noise_model=thermal_relaxation_model_V2(T2=T2, t_cz=t_cz),
         memory=True,
         shots=n_shots
@@ -124,42 +142,46 @@ def get_fidelity_data(circ, param_list, n_shots=2048,
     select_fraction = select_count/n_shots
     data = np.zeros(n_shots)
 
+    # Both states are pure, so the fidelity of each shot is |<correct|psi_j>|^2.
+    # Single precision is plenty for the fidelities and halves the memory
+    # traffic of the snapshots.
+    psi = np.asarray(correct_state, dtype=np.complex64).ravel()
+    statevectors = np.asarray(
+        results.data()['snapshots']['statevector']['stabilizer_0'],
+        dtype=np.complex64).reshape(n_shots, -1)
+    # Only the converted snapshots are needed from here on, so free the
+    # Result before the fidelity contractions
+    del results
+
     if post_select:
         # Post-selection
-        post_selection = np.array(
-            results.data()['snapshots']['statevector']['stabilizer_0']
-        )[select_indices]
+        post_selection = statevectors[select_indices]
 
         # Analyze results
-        for j in range(select_count):
-            statevector = post_selection[j]
-            data[j] = state_fidelity(statevector, correct_state)
+        data[:select_count] = np.abs(post_selection @ psi.conj())**2
         fid = np.sum(data)/select_count
     else:
-        for j in range(n_shots):
-            statevector = results.data(
-            )['snapshots']['statevector']['stabilizer_0'][j]
-            data[j] = state_fidelity(statevector, correct_state)
+        data[:] = np.abs(statevectors @ psi.conj())**2
         fid = np.sum(data)/select_count
     return fid, select_fraction, data
 
 
-def reformat_density_snapshot(results) -> dict:
+def reformat_density_snapshot(results, experiment=None) -> dict:
     """Reformats the snapshot data of the results object to be a 
     dictionary with the measurement results as keys
     """
     snap_dict = {}
-    for snapshot_name in results.data()['snapshots']['density_matrix']:
+    data = results.data(experiment)
+    for snapshot_name in data['snapshots']['density_matrix']:
         res_dict = {}
-        for item in results.data()[
-                'snapshots']['density_matrix'][snapshot_name]:
+        for item in data['snapshots']['density_matrix'][snapshot_name]:
             res_dict[item['memory']] = item['value']
         snap_dict[snapshot_name] = res_dict
     return snap_dict
 
 
-def get_post_select_fraction_for_density_matrix(results, n_shots):
-    syndrome_reg_counts = get_subsystems_counts(results.get_counts())[1]
+def get_post_select_fraction_for_density_matrix(results, n_shots, experiment=None):
+    syndrome_reg_counts = get_subsystems_counts(results.get_counts(experiment))[1]
     count_trivial_syndrome = 0
     for key in syndrome_reg_counts:
         if int(key) == 0:
@@ -167,47 +189,54 @@ def get_post_select_fraction_for_density_matrix(results, n_shots):
     return count_trivial_syndrome/n_shots
 
 
-def get_fidelity_data_den_mat(circ, param_list, n_shots=2048,
+def get_fidelity_data_den_mat(circuit_list, param_list, n_shots=2048,
                               post_select=True):
     '''Inputs:
-    circ: The circuit to be tested
-    correct_state: The correct state for comparison
+    circuit_list: The circuits to be tested. These share the same noise model
+                  and are run together in a single job.
     param_list: The error model parameters, currently only [T2, t_cz]
     n_shots: Number of shots to average over
+
+    Returns the fidelity and selection fraction of each circuit.
     '''
     T2, t_cz = param_list
 
     # Get correct state
     results = execute(
-        circ,
+        circuit_list,
         Aer.get_backend('qasm_simulator'),
         noise_model=None,
         shots=1,
     ).result()
 
-    snapshots = reformat_density_snapshot(results)
     # TODO: Make this work if circuit it permuted for later stabilizers
     # TODO: More sophisticated key than '0x0'?
-    correct_state = snapshots['stabilizer_0']['0x0']
+    correct_states = [reformat_density_snapshot(results, index)['stabilizer_0']['0x0']
+                      for index in range(len(circuit_list))]
 
-    # Run the circuit
+    # Run the circuits. This runs in one of the parallel sweep processes, so
+    # limit Aer to one thread rather than every process using all cores
     results = execute(
-        circ,
+        circuit_list,
         Aer.get_backend('qasm_simulator'),
         noise_model=thermal_relaxation_model_V2(T2=T2, t_cz=t_cz),
         memory=True,
-        shots=n_shots
+        shots=n_shots,
+        max_parallel_threads=1
     ).result()
 
     # TODO: make post_select=False possible
-    # Post-selection
-    select_fraction = get_post_select_fraction_for_density_matrix(
-        results, n_shots)
-    snapshots = reformat_density_snapshot(results)
-    post_selection = snapshots['stabilizer_0']['0x0']
+    fid = np.zeros(len(circuit_list))
+    select_fraction = np.zeros(len(circuit_list))
+    for index in range(len(circuit_list)):
+        # Post-selection
+        select_fraction[index] = get_post_select_fraction_for_density_matrix(
+            results, n_shots, index)
+        snapshots = reformat_density_snapshot(results, index)
+        post_selection = snapshots['stabilizer_0']['0x0']
 
-    # Analyze results
-    fid = state_fidelity(post_selection, correct_state)
+        # Analyze results
+        fid[index] = fidelity_mm(post_selection, correct_states[index])
 
     return fid, select_fraction
 
@@ -217,56 +246,23 @@ T2_list = np.arange(40, 81, 20)*1e3  # 40-80 mus
 t_cz_list = np.arange(100, 301, 100)  # 100-300 ns
 n_shots = 10  # 1024*4
 
-fid_T2 = np.zeros(len(T2_list))
-fid_t = np.zeros(len(t_cz_list))
-T2_results_list = []
-t_cz_results_list = []
-P_T2_list = []
-P_t_list = []
-for index in range(len(circuit_list)):  # Loop over circuits
-
-    # Post selection, vary T2
-    t_cz = 200
-    fid_T2 = np.zeros(len(T2_list))
-    P_T2 = np.zeros(len(T2_list))
-    for i in range(len(T2_list)):
-        param_list = [T2_list[i], t_cz]
-        # fid_T2[i], _, _ = get_fidelity_data(
-        #     circ=circuit_list[index],
-        #     # correct_state=correct_state[index],
-        #     param_list=param_list,
-        #     n_shots=1024,
-        # )
-        fid_T2[i], P_T2[i] = get_fidelity_data_den_mat(
-            circ=circuit_list[index],
-            # correct_state=correct_state[index],
-            param_list=param_list,
-            n_shots=1024,
-        )
-    T2_results_list.append(fid_T2)
-    P_T2_list.append(P_T2)
-
-    # Post selection, vary t_cz
-    T2 = 60e3
-    fid_t = np.zeros(len(t_cz_list))
-    P_t = np.zeros(len(t_cz_list))
-    for i in range(len(t_cz_list)):
-        param_list = [T2, t_cz_list[i]]
-        # fid_t[i], _, _ = get_fidelity_data(
-        #     circ=circuit_list[index],
-        #     # correct_state=correct_state[index],
-        #     param_list=param_list,
-        #     n_shots=1024,
-        # )
-        fid_t[i], P_t[i] = get_fidelity_data_den_mat(
-            circ=circuit_list[index],
-            # correct_state=correct_state[index],
-            param_list=param_list,
-            n_shots=1024,
-        )
-    t_cz_results_list.append(fid_t)
-    P_t_list.append(P_t)
-    print('boop')
+# Post selection, vary T2 at t_cz = 200 ns, then vary t_cz at T2 = 60 mus
+param_lists = [[T2, 200] for T2 in T2_list] + \
+    [[60e3, t_cz] for t_cz in t_cz_list]
+# The parameter points are independent, so run them in parallel processes
+# (use get_fidelity_data for the statevector version)
+sweep_results = Parallel(n_jobs=-1, backend='loky')(
+    delayed(get_fidelity_data_den_mat)(
+        circuit_list=circuit_list,
+        param_list=param_list,
+        n_shots=1024,
+    ) for param_list in param_lists)
+fid_data = np.array([fid for fid, _ in sweep_results]).T
+P_data = np.array([P for _, P in sweep_results]).T
+T2_results_list = list(fid_data[:, :len(T2_list)])
+t_cz_results_list = list(fid_data[:, len(T2_list):])
+P_T2_list = list(P_data[:, :len(T2_list)])
+P_t_list = list(P_data[:, len(T2_list):])
 # %% Plotting
 fig, axs = plt.subplots(4, figsize=(14, 16))
 ax1, ax2, ax3, ax4 = axs
@@ -443,7 +439,7 @@ def get_running_fidelity_data_den_mat(circ, n_shots=2048,
                 select_fraction = get_running_post_select_fraction_for_density_matrix_v2(
                     results, n_shots, current_cycle)
                 select_fractions.append(select_fraction)
-                fidelities.append(state_fidelity(
+                fidelities.append(fidelity_mm(
                     post_selection, correct_state))
             except:
                 print("No selectable states")
@@ -465,8 +461,8 @@ def get_running_fidelity_data_den_mat(circ, n_shots=2048,
                     formated_outcome = outcome.replace(
                         ' ', '')[-cl_reg_size*(current_cycle+1):]
                     if formated_outcome == bin_string:
-                        fid += state_fidelity(current_state,
-                                              correct_state)*counts[outcome]
+                        fid += fidelity_mm(current_state,
+                                           correct_state)*counts[outcome]
             fidelities.append(fid/n_shots)
         return fidelities
 